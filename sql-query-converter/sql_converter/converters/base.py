@@ -1,11 +1,11 @@
 # File: sql-query-converter/sql_converter/converters/base.py
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Any, Dict, Optional
 import logging
 
 class BaseConverter(ABC):
 
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
         self.logger = logging.getLogger(self.__class__.__name__)
 
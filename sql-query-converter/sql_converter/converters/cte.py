@@ -1,42 +1,77 @@
 import re
+import sys
+import heapq
 import logging
+from collections import defaultdict
 from typing import List, Tuple, Dict, Optional, Any, Match, Pattern, Set
 
 from sql_converter.converters.base import BaseConverter
 from sql_converter.parsers.sql_parser import SQLParser
-from sql_converter.exceptions import ConverterError, ValidationError, SQLSyntaxError, ConfigError
+from sql_converter.exceptions import (
+    ConverterError, ValidationError, SQLSyntaxError, ConfigError, truncate_source
+)
 
 
-class CTEConverter(BaseConverter):
-    """Converts SQL queries with temporary tables to Common Table Expressions (CTEs)."""
+# Characters that may follow '#' in a plain temp table identifier
+_TEMP_REF_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_')
+_SIMPLE_TEMP_NAME = re.compile(r'#[A-Za-z0-9_]+\Z')
+
+
+def _scan_temp_refs(sql: str) -> List[Tuple[int, int, str]]:
+    """
+    Find '#'-prefixed identifiers in SQL without running the regex engine.
     
-    # Precompile regex patterns for performance
-    _SELECT_INTO_PATTERN = re.compile(
-        r'^\s*SELECT\s+(?P<select_clause>.+?)\s+INTO\s+(?P<table>\S+)\s+(?P<remainder>FROM.*)',
-        re.IGNORECASE | re.DOTALL
-    )
+    Jumps between '#' characters with str.find and only walks the identifier
+    characters that follow each one.
     
-    _CREATE_TEMP_AS_PATTERN1 = re.compile(
-        r'^\s*CREATE\s+TEMP\s+TABLE\s+(?P<table>\S+)\s+AS\s*(?P<query>SELECT.*)',
-        re.IGNORECASE | re.DOTALL
-    )
+    Args:
+        sql: SQL text to scan
+        
+    Returns:
+        List of (start, end, name) tuples in order of appearance
+    """
+    refs: List[Tuple[int, int, str]] = []
+    length = len(sql)
+    start = sql.find('#')
+    while start != -1:
+        end = start + 1
+        while end < length and sql[end] in _TEMP_REF_CHARS:
+            end += 1
+        if end > start + 1:
+            refs.append((start, end, sql[start:end]))
+        start = sql.find('#', end)
+    return refs
+
+
+class CTEConverter(BaseConverter):
+    """Converts SQL queries with temporary tables to Common Table Expressions (CTEs)."""
     
-    _CREATE_TEMP_AS_PATTERN2 = re.compile(
-        r'^\s*CREATE\s+TEMP\s+TABLE\s+(?P<table>\S+)\s+AS\s*\((?P<query>SELECT.*?)(?:\)|;|\s*$)',
+    # Single anchored classifier for temp table statements; which group
+    # matched tells the statement kind:
+    #   si_*  - SELECT ... INTO #temp FROM ...
+    #   ct_*  - CREATE TEMP TABLE #temp [AS SELECT ... | AS (SELECT ...)]
+    #   ins_* - INSERT INTO #temp SELECT ...
+    _STMT_CLASSIFIER = re.compile(
+        r'^\s*(?:'
+        r'SELECT\s+(?P<si_sel>.+?)\s+INTO\s+(?P<si_tbl>\S+)\s+(?P<si_rem>FROM.*)'
+        r'|CREATE\s+TEMP\s+TABLE\s+(?P<ct_tbl>\S+)'
+        r'(?:\s+AS\s*(?:(?P<ct_q1>SELECT.*)|\((?P<ct_q2>SELECT.*?)(?:\)|;|\s*$))|)'
+        r'|INSERT\s+INTO\s+(?P<ins_tbl>\S+)\s+(?P<ins_q>SELECT.*)'
+        r')',
         re.IGNORECASE | re.DOTALL
     )
     
-    _CREATE_TEMP_PATTERN = re.compile(
-        r'^\s*CREATE\s+TEMP\s+TABLE\s+(?P<table>\S+)',
+    # Table references: the target of FROM/JOIN (captured in a lookahead so
+    # that '#' references inside it are still visited) or any '#name'
+    _REF_PATTERN = re.compile(
+        r'(?:FROM|JOIN)\s+(?:\w+\.)?(?=(?P<qual>[^\s,;()]+))|(?P<hash>#\w+)',
         re.IGNORECASE
     )
     
-    _INSERT_INTO_PATTERN = re.compile(
-        r'^\s*INSERT\s+INTO\s+(?P<table>\S+)\s+(?P<query>SELECT.*)',
-        re.IGNORECASE | re.DOTALL
-    )
+    # Wildcards understood in temp_table_patterns and their regex equivalents
+    _WILDCARDS = {'?': '.?', '*': '.*', '.': '.'}
     
-    def __init__(self, config: Dict[str, Any] = None):
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
         """
         Initialize CTEConverter with configuration.
         
@@ -48,31 +83,38 @@ class CTEConverter(BaseConverter):
         
         # Configuration with defaults
         self.indent_spaces = self.config.get('indent_spaces', 4)
+        self._indent_str = ' ' * self.indent_spaces
         temp_table_patterns = self.config.get('temp_table_patterns', ['#.*'])
         
         # Initialize components
-        self.parser = SQLParser()
+        self.parser = SQLParser.for_dialect()
         
         # Compile temp table regex from patterns
         try:
-            self.temp_table_regex = self._process_patterns(temp_table_patterns)
+            self._temp_table_re = self._process_patterns(temp_table_patterns)
         except Exception as e:
             raise ConfigError(f"Failed to process temp table patterns: {str(e)}")
+        self._temp_prefixes = self._pattern_prefixes(temp_table_patterns)
         
         # Conversion state - will be reset for each conversion
-        self.temp_tables = {}
-        self.temp_table_order = []  # Track order of appearance
-        self.current_temp_table = None
+        self.temp_tables: Dict[str, Dict[str, Any]] = {}
+        self.current_temp_table: Optional[str] = None
+        self._scan_refs = False  # All temp names are plain '#identifier's
+        self._ref_pattern: Optional[Pattern[str]] = None  # Fused reference pattern
 
-    def _process_patterns(self, patterns: List[str]) -> str:
+    def _process_patterns(self, patterns: List[str]) -> Pattern[str]:
         """
         Convert configuration patterns to regex pattern.
         
+        Wildcards are '?' (optional character), '*' (any run of characters)
+        and '.' (any character); everything else matches literally. The result
+        is anchored so that a whole table name has to match.
+        
         Args:
             patterns: List of pattern strings
             
         Returns:
-            Compiled regex pattern string
+            Compiled, case-insensitive regex pattern
             
         Raises:
             ConfigError: When pattern processing fails
@@ -80,14 +122,12 @@ class CTEConverter(BaseConverter):
         if not patterns:
             raise ConfigError("No temp table patterns provided")
             
-        regex_fragments = []
+        regex_fragments: List[str] = []
         for i, pattern in enumerate(patterns):
             try:
-                # Convert simplified pattern to regex
-                processed = (
-                    pattern.replace('?', '.?')
-                           .replace('*', '.*')
-                           .replace('#', r'\#')
+                # Convert simplified pattern to regex, escaping literal characters
+                processed = ''.join(
+                    self._WILDCARDS.get(char) or re.escape(char) for char in pattern
                 )
                 regex_fragments.append(processed)
             except Exception as e:
@@ -95,9 +135,31 @@ class CTEConverter(BaseConverter):
         
         if not regex_fragments:
             self.logger.warning("No valid patterns found, using default pattern '#.*'")
-            return r'\#.*'
+            return re.compile(r'\A(?:#.*)\Z', re.IGNORECASE)
+            
+        return re.compile(r'\A(?:' + '|'.join(regex_fragments) + r')\Z', re.IGNORECASE)
+
+    def _pattern_prefixes(self, patterns: List[str]) -> Tuple[str, ...]:
+        """
+        Collect the literal first characters of the temp table patterns.
+        
+        Every temp table name has to start with one of these, which allows a
+        cheap startswith() rejection before running the regex.
+        
+        Args:
+            patterns: List of pattern strings
             
-        return '|'.join(regex_fragments)
+        Returns:
+            Tuple of prefixes (both cases), or an empty tuple when some pattern
+            can start with any character
+        """
+        prefixes: List[str] = []
+        for pattern in patterns:
+            first = pattern[:1]
+            if not first or first in self._WILDCARDS or not first.isascii():
+                return ()
+            prefixes.extend((first.lower(), first.upper()))
+        return tuple(dict.fromkeys(prefixes))
 
     def convert(self, sql: str) -> str:
         """
@@ -117,8 +179,9 @@ class CTEConverter(BaseConverter):
         try:
             # Reset state for this conversion
             self.temp_tables = {}
-            self.temp_table_order = []  # Reset temp table order
             self.current_temp_table = None
+            self._scan_refs = False
+            self._ref_pattern = None
             
             # Phase 1: Split the SQL into statements
             statements = self.parser.split_statements(sql)
@@ -127,7 +190,7 @@ class CTEConverter(BaseConverter):
             self._identify_temp_tables(statements)
             
             # Phase 3: Build dependency graph
-            dependency_graph = self._build_dependency_graph(statements)
+            dependency_graph = self._build_dependency_graph()
             
             # Phase 4: Generate CTEs in topological order
             ctes = self._generate_ctes(dependency_graph)
@@ -147,95 +210,117 @@ class CTEConverter(BaseConverter):
         except Exception as e:
             error_msg = f"Failed to convert SQL: {str(e)}"
             self.logger.error(error_msg)
-            snippet = sql[:100] + "..." if len(sql) > 100 else sql
-            raise ConverterError(error_msg, source=snippet) from e
+            raise ConverterError(
+                error_msg,
+                source_provider=lambda: truncate_source(sql)
+            ) from e
 
     def _identify_temp_tables(self, statements: List[str]) -> None:
         """
         Identify temporary tables and their definitions in SQL statements.
         
+        Temp table names are interned so the repeated dictionary lookups in
+        the later phases hit the identity fast path.
+        
         Args:
             statements: List of SQL statements
         """
-        # Initialize/reset the temp table order tracking
-        self.temp_table_order = []
-        
-        for stmt in statements:
-            # Check for "SELECT ... INTO #temp"
-            select_into_match = self._SELECT_INTO_PATTERN.match(stmt)
-            if select_into_match:
-                table_name = select_into_match.group('table')
-                if self._is_temp_table(table_name):
-                    # Only add to order list the first time we see it
-                    if table_name not in self.temp_tables:
-                        self.temp_table_order.append(table_name)
-                        
-                    select_clause = select_into_match.group('select_clause')
-                    from_clause = select_into_match.group('remainder')
-                    definition = f"SELECT {select_clause}\n{from_clause}"
-                    
-                    self.temp_tables[table_name] = {
-                        'definition': definition,
-                        'cte_name': self._get_cte_name(table_name),
-                        'type': 'SELECT_INTO',
-                        'statement': stmt
-                    }
-                    continue
-                    
-            # Check for "CREATE TEMP TABLE #temp AS SELECT ..."
-            create_temp_match = (self._CREATE_TEMP_AS_PATTERN1.match(stmt) or 
-                                self._CREATE_TEMP_AS_PATTERN2.match(stmt))
-            if create_temp_match:
-                table_name = create_temp_match.group('table')
+        # Index of the CREATE TEMP TABLE awaiting its INSERT INTO
+        declared_idx: Optional[int] = None
+        for stmt_idx, stmt in enumerate(statements):
+            match = self._STMT_CLASSIFIER.match(stmt)
+            if not match:
+                continue
+            
+            # "SELECT ... INTO #temp"
+            table_name = match.group('si_tbl')
+            if table_name is not None:
+                table_name = sys.intern(table_name)
                 if self._is_temp_table(table_name):
-                    # Only add to order list the first time we see it
-                    if table_name not in self.temp_tables:
-                        self.temp_table_order.append(table_name)
-                        
-                    definition = create_temp_match.group('query').strip()
-                    if definition.endswith(';'):
-                        definition = definition[:-1]
+                    definition = self._canonical_definition(
+                        f"SELECT {match.group('si_sel')}\n{match.group('si_rem')}"
+                    )
                     
-                    self.temp_tables[table_name] = {
-                        'definition': definition,
-                        'cte_name': self._get_cte_name(table_name),
-                        'type': 'CREATE_TEMP_AS',
-                        'statement': stmt
-                    }
-                    continue
+                    self._define_temp_table(table_name, definition, 'SELECT_INTO', stmt_idx)
+                continue
             
-            # Check for "CREATE TEMP TABLE" followed by "INSERT INTO"
-            create_temp_match = self._CREATE_TEMP_PATTERN.match(stmt)
-            if create_temp_match:
-                table_name = create_temp_match.group('table')
+            # "CREATE TEMP TABLE #temp", with or without "AS SELECT ..."
+            table_name = match.group('ct_tbl')
+            if table_name is not None:
+                table_name = sys.intern(table_name)
                 if self._is_temp_table(table_name):
-                    # Only add to order list the first time we see it
-                    if table_name not in self.temp_tables:
-                        self.temp_table_order.append(table_name)
-                        
-                    self.current_temp_table = table_name
-                    continue
+                    query = match.group('ct_q1') or match.group('ct_q2')
+                    if query is None:
+                        # Definition follows in an INSERT INTO statement
+                        self.current_temp_table = table_name
+                        declared_idx = stmt_idx
+                        continue
+                    
+                    self._define_temp_table(
+                        table_name, self._canonical_definition(query), 'CREATE_TEMP_AS', stmt_idx
+                    )
+                continue
             
-            # Check for "INSERT INTO #temp"
-            if self.current_temp_table:
-                insert_pattern = re.compile(
-                    rf'^\s*INSERT\s+INTO\s+{re.escape(self.current_temp_table)}\s+(?P<query>SELECT.*)',
-                    re.IGNORECASE | re.DOTALL
+            # "INSERT INTO #temp" for the table created above
+            if (self.current_temp_table
+                    and match.group('ins_tbl').lower() == self.current_temp_table.lower()):
+                definition = self._canonical_definition(match.group('ins_q'))
+                
+                self._define_temp_table(
+                    self.current_temp_table, definition, 'INSERT_INTO', stmt_idx, declared_idx
                 )
-                insert_match = insert_pattern.match(stmt)
-                if insert_match:
-                    definition = insert_match.group('query').strip()
-                    if definition.endswith(';'):
-                        definition = definition[:-1]
-                    
-                    self.temp_tables[self.current_temp_table] = {
-                        'definition': definition,
-                        'cte_name': self._get_cte_name(self.current_temp_table),
-                        'type': 'INSERT_INTO',
-                        'statement': stmt
-                    }
-                    self.current_temp_table = None
-                    continue
+                self.current_temp_table = None
+        
+        # Plain '#identifier' names can be located with the fast scanner
+        self._scan_refs = all(_SIMPLE_TEMP_NAME.match(name) for name in self.temp_tables)
+
+    def _define_temp_table(self, table_name: str, definition: str, def_type: str,
+                           stmt_idx: int, declared_idx: Optional[int] = None) -> None:
+        """
+        Record a temp table definition.
+        
+        A redefinition replaces the CTE body but keeps the indexes of the
+        earlier defining statements, so that none of them ends up in the main
+        query, and the position where the table was first declared, which
+        orders independent CTEs.
+        
+        Args:
+            table_name: Temp table name
+            definition: Canonical definition query
+            def_type: Kind of defining statement
+            stmt_idx: Index of the defining statement
+            declared_idx: Index of the statement declaring the table, when it
+                precedes the definition (CREATE TEMP TABLE before INSERT INTO)
+        """
+        previous = self.temp_tables.get(table_name)
+        if previous:
+            stmt_idxs: List[int] = previous['stmt_idxs']
+            position: int = previous['position']
+        else:
+            stmt_idxs = []
+            position = stmt_idx if declared_idx is None else declared_idx
+        stmt_idxs.append(stmt_idx)
+        
+        self.temp_tables[table_name] = {
+            'definition': definition,
+            'cte_name': self._get_cte_name(table_name),
+            'type': def_type,
+            'stmt_idxs': stmt_idxs,
+            'position': position
+        }
+
+    @staticmethod
+    def _canonical_definition(definition: str) -> str:
+        """
+        Normalize a temp table definition for use as a CTE body.
+        
+        Args:
+            definition: Raw definition query
+            
+        Returns:
+            Definition without surrounding whitespace or trailing semicolons
+        """
+        return definition.strip().rstrip(';').rstrip()
 
     def _is_temp_table(self, table_name: str) -> bool:
         """
@@ -247,7 +332,9 @@ class CTEConverter(BaseConverter):
         Returns:
             True if it's a temp table, False otherwise
         """
-        return bool(re.search(self.temp_table_regex, table_name))
+        if self._temp_prefixes and not table_name.startswith(self._temp_prefixes):
+            return False
+        return self._temp_table_re.search(table_name) is not None
 
     def _get_cte_name(self, temp_name: str) -> str:
         """
@@ -257,11 +344,11 @@ class CTEConverter(BaseConverter):
             temp_name: Original temp table name
             
         Returns:
-            Cleaned name suitable for a CTE
+            Cleaned name suitable for a CTE (interned, as it is used as a key)
         """
-        return temp_name.lstrip('#').replace('.', '_')
+        return sys.intern(temp_name.lstrip('#').replace('.', '_'))
 
-    def _extract_table_references(self, sql: str) -> Set[str]:
+    def _extract_table_references(self, sql: str) -> List[str]:
         """
         Extract all table references from SQL that match temp table patterns.
         
@@ -269,45 +356,93 @@ class CTEConverter(BaseConverter):
             sql: SQL statement to analyze
             
         Returns:
-            Set of referenced temp table names
+            Referenced temp table names, without duplicates, in the order found
         """
-        references = set()
-    
-        # FIXED: Improved regex to better catch table references
-        # Look for FROM/JOIN followed by anything that's not a space, comma, semicolon, or parenthesis
-        pattern = re.compile(
-            r'(?:FROM|JOIN)\s+(?:\w+\.)?([^\s,;()]+)',
-            re.IGNORECASE
-        )
-        
-        # Also specifically look for temp tables with # prefix
-        temp_pattern = re.compile(r'#\w+', re.IGNORECASE)
-        
-        # Check regular FROM/JOIN references
-        for match in pattern.finditer(sql):
-            table_ref = match.group(1)
-            if self._is_temp_table(table_ref) and table_ref in self.temp_tables:
-                references.add(table_ref)
-        
-        # ADDED: Also look for direct # references anywhere
-        for match in temp_pattern.finditer(sql):
-            table_ref = match.group(0)
-            if table_ref in self.temp_tables:
-                references.add(table_ref)
-        
-        return references
+        references: List[str] = []
+        
+        if self._scan_refs:
+            # Every temp name is a plain '#identifier', so the scanner finds
+            # FROM/JOIN targets along with all other direct references; a
+            # non-ASCII word character continues the name, as it does for \w
+            for _, end, name in _scan_temp_refs(sql):
+                if name in self.temp_tables and not sql[end:end + 1].isalnum():
+                    references.append(name)
+            return list(dict.fromkeys(references))
+        
+        # Single sweep over FROM/JOIN targets and direct '#' references;
+        # exactly one of the two groups is non-empty per match
+        for qual_ref, hash_ref in self._REF_PATTERN.findall(sql):
+            if qual_ref:
+                if self._is_temp_table(qual_ref) and qual_ref in self.temp_tables:
+                    references.append(qual_ref)
+            elif hash_ref in self.temp_tables:
+                references.append(hash_ref)
+        
+        return list(dict.fromkeys(references))
 
-    def _build_dependency_graph(self, statements: List[str]) -> Dict[str, List[str]]:
+    def _replace_temp_refs(self, sql: str, exclude: Optional[str] = None) -> str:
         """
-        Build a dependency graph between temp tables.
+        Replace temp table references in SQL with their CTE names.
         
         Args:
-            statements: List of SQL statements
+            sql: SQL text to rewrite
+            exclude: Temp table name to leave untouched (e.g. a self-reference)
             
+        Returns:
+            SQL with temp table references replaced
+        """
+        cte_names = {
+            name.lower(): info['cte_name']
+            for name, info in self.temp_tables.items()
+            if name != exclude
+        }
+        
+        if self._scan_refs:
+            # Single pass: splice CTE names in at the scanned offsets
+            parts: List[str] = []
+            pos = 0
+            for start, end, name in _scan_temp_refs(sql):
+                cte_name = cte_names.get(name.lower())
+                if cte_name is None or (start and sql[start - 1] in _TEMP_REF_CHARS):
+                    continue
+                parts.append(sql[pos:start])
+                parts.append(cte_name)
+                pos = end
+            parts.append(sql[pos:])
+            return ''.join(parts)
+        
+        if not self.temp_tables:
+            return sql
+        
+        if self._ref_pattern is None:
+            # One alternation over all temp names, longest first so that a
+            # shorter name never shadows a longer one sharing its prefix
+            names = sorted(self.temp_tables, key=len, reverse=True)
+            self._ref_pattern = re.compile(
+                r'(?<![a-zA-Z0-9_])(' + '|'.join(re.escape(name) for name in names) + r')(?![a-zA-Z0-9_])',
+                re.IGNORECASE
+            )
+        
+        def replace(m: Match[str]) -> str:
+            # Excluded names are matched too, but map back to themselves
+            name: str = m.group(1)
+            return cte_names.get(name.lower(), name)
+        
+        return self._ref_pattern.sub(replace, sql)
+
+    def _build_dependency_graph(self) -> Dict[str, Set[str]]:
+        """
+        Build a dependency graph between temp tables.
+        
+        Only temp table definitions create edges. Tables that are merely
+        referenced together by the main query don't depend on each other.
+        
         Returns:
             Dictionary mapping temp tables to their dependencies
         """
-        dependency_graph = {name: [] for name in self.temp_tables}
+        # Every temp table gets a node, and every edge below points between
+        # temp tables, so no default factory is needed
+        dependency_graph: Dict[str, Set[str]] = {name: set() for name in self.temp_tables}
         
         # Process defined temp tables first
         for temp_name, temp_info in self.temp_tables.items():
@@ -317,139 +452,76 @@ class CTEConverter(BaseConverter):
             
             for ref in references:
                 if ref in self.temp_tables and ref != temp_name:  # Avoid self-references
-                    dependency_graph[temp_name].append(ref)
-        
-        # Find any references in the main query
-        for stmt in statements:
-            # Skip statements that define temp tables
-            if any(info['statement'] == stmt for info in self.temp_tables.values()):
-                continue
-                
-            # Check for implicit dependencies between temp tables
-            # that are referenced in the same statement
-            references = self._extract_table_references(stmt)
-            if len(references) > 1:
-                # Multiple temp tables are referenced in this statement
-                # Create implicit dependencies based on order of reference
-                references_list = list(references)
-                for i in range(len(references_list) - 1):
-                    for j in range(i + 1, len(references_list)):
-                        ref1 = references_list[i]
-                        ref2 = references_list[j]
-                        if ref2 not in dependency_graph[ref1]:
-                            dependency_graph[ref1].append(ref2)
+                    dependency_graph[temp_name].add(ref)
         
         return dependency_graph
 
-    def _generate_ctes(self, dependency_graph: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+    def _generate_ctes(self, dependency_graph: Dict[str, Set[str]]) -> List[Tuple[str, str]]:
         """
         Generate CTEs in proper dependency order using topological sort while 
         preserving original order within same dependency level.
         
+        This is the final CTE order: of the tables whose dependencies have
+        been emitted, the one declared first comes next.
+        
         Args:
             dependency_graph: Dependency graph of temp tables
             
         Returns:
             List of (cte_name, definition) tuples in proper order
         """
-        # Track original order of appearance using our explicit tracking list
-        original_order = {name: idx for idx, name in enumerate(self.temp_table_order)}
-        
-        # Helper function for topological sort
-        def topological_sort():
-            # Track permanent and temporary marks for cycle detection
-            permanent_mark = set()
-            temporary_mark = set()
-            result = []
-            
-            def visit(node):
-                if node in permanent_mark:
-                    return
-                if node in temporary_mark:
-                    raise ValidationError(f"Circular dependency detected involving {node}")
-                    
-                temporary_mark.add(node)
-                
-                # Visit dependencies first
-                for dependency in dependency_graph.get(node, []):
-                    visit(dependency)
-                    
-                temporary_mark.remove(node)
-                permanent_mark.add(node)
-                result.append(node)
-                
-            # Visit all nodes
-            for node in dependency_graph:
-                if node not in permanent_mark:
-                    visit(node)
-                    
-            return result
-        
-        # Get the ordered list of temp table names
-        ordered_temp_tables = topological_sort()
-        
-        # Calculate dependency level for each table
-        levels = {}
-        for node in ordered_temp_tables:
-            # Calculate level (max level of dependencies + 1)
-            max_dep_level = 0
-            for dep in dependency_graph.get(node, []):
-                if dep in levels:
-                    max_dep_level = max(max_dep_level, levels[dep] + 1)
-            levels[node] = max_dep_level
-        
-        # Group nodes by level
-        level_groups = {}
-        for node, level in levels.items():
-            if level not in level_groups:
-                level_groups[level] = []
-            level_groups[level].append(node)
-        
-        # Sort each level by original order
-        for level in level_groups:
-            # Use get() with a default to handle any tables not in our order list
-            level_groups[level].sort(key=lambda x: original_order.get(x, float('inf')))
-        
-        # Build final ordered list respecting both dependencies and original order
-        final_ordered_tables = []
-        for level in sorted(level_groups.keys()):
-            final_ordered_tables.extend(level_groups[level])
+        # Track original order of appearance, by declaring statement
+        original_order = {name: info['position'] for name, info in self.temp_tables.items()}
+        
+        # Kahn's algorithm: a table is ready once all of its dependencies have
+        # been emitted; ready tables are taken in original order of appearance
+        indegree = {name: len(deps) for name, deps in dependency_graph.items()}
+        dependents: Dict[str, List[str]] = defaultdict(list)
+        for name, deps in dependency_graph.items():
+            for dep in deps:
+                dependents[dep].append(name)
+        
+        ready = [
+            (original_order[name], name)
+            for name, count in indegree.items() if count == 0
+        ]
+        heapq.heapify(ready)
+        
+        final_ordered_tables: List[str] = []
+        while ready:
+            _, node = heapq.heappop(ready)
+            final_ordered_tables.append(node)
+            for dependent in dependents[node]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    heapq.heappush(ready, (original_order[dependent], dependent))
+        
+        # Anything left unemitted is part of (or waiting on) a cycle. Each
+        # leftover table still waits on a leftover dependency, so following
+        # those from any of them must revisit a table that is on a cycle.
+        if len(final_ordered_tables) < len(dependency_graph):
+            leftover = {name for name, count in indegree.items() if count > 0}
+            node = min(leftover, key=original_order.__getitem__)
+            seen: Set[str] = set()
+            while node not in seen:
+                seen.add(node)
+                node = min(leftover & dependency_graph[node], key=original_order.__getitem__)
+            raise ValidationError(f"Circular dependency detected involving {node}")
         
         # Generate CTE definitions
-        ctes = []
+        ctes: List[Tuple[str, str]] = []
         for temp_name in final_ordered_tables:
             # Get the cleaned name and definition
             cte_name = self.temp_tables[temp_name]['cte_name']
-            definition = self.temp_tables[temp_name]['definition']
-            
-            # FIXED: Use the same improved pattern for replacing references
-            for ref_temp_name in self.temp_tables:
-                if ref_temp_name != temp_name:  # Avoid self-references
-                    ref_cte_name = self.temp_tables[ref_temp_name]['cte_name']
-                    # Use the same improved pattern we used in _transform_main_query
-                    pattern = r'(?<![a-zA-Z0-9_])' + re.escape(ref_temp_name) + r'(?![a-zA-Z0-9_])'
-                    definition = re.sub(pattern, ref_cte_name, definition, flags=re.IGNORECASE)
+            # Avoid self-references
+            definition = self._replace_temp_refs(
+                self.temp_tables[temp_name]['definition'], exclude=temp_name
+            )
             
             ctes.append((cte_name, definition))
         
         return ctes
 
-    def _is_temp_definition(self, stmt: str) -> bool:
-        """
-        Check if a statement defines a temp table.
-        
-        Args:
-            stmt: SQL statement to check
-            
-        Returns:
-            True if it defines a temp table, False otherwise
-        """
-        # Check if this statement matches any of the temp table definition patterns
-        for temp_info in self.temp_tables.values():
-            if temp_info['statement'] == stmt:
-                return True
-        return False
-
     def _transform_main_query(self, statements: List[str]) -> str:
         """
         Transform the main query by replacing temp table references with CTE names.
@@ -461,58 +533,55 @@ class CTEConverter(BaseConverter):
             Transformed main query
         """
         # Filter out statements that define temp tables
-        main_statements = []
-        for stmt in statements:
-            if not self._is_temp_definition(stmt):
-                main_statements.append(stmt)
+        defining_idx = {
+            idx for info in self.temp_tables.values() for idx in info['stmt_idxs']
+        }
+        main_statements = [stmt for i, stmt in enumerate(statements) if i not in defining_idx]
         
         # Replace temp table references in remaining statements
-        transformed_statements = []
+        transformed_statements: List[str] = []
         for stmt in main_statements:
-            transformed = stmt
-            for temp_name, info in self.temp_tables.items():
-                cte_name = info['cte_name']
-                pattern = r'(?<![a-zA-Z0-9_])' + re.escape(temp_name) + r'(?![a-zA-Z0-9_])'
-                transformed = re.sub(pattern, cte_name, transformed, flags=re.IGNORECASE)
-            transformed_statements.append(transformed)
+            transformed_statements.append(self._replace_temp_refs(stmt))
         
         # Join statements WITHOUT stripping semicolons
         return "\n".join(transformed_statements)  # Removed the rstrip(';
 
     def _assemble_final_query(self, ctes: List[Tuple[str, str]], main_query: str) -> str:
+        """
+        Assemble the WITH clause and the main query.
+        
+        Args:
+            ctes: (cte_name, definition) tuples, emitted in the given order
+            main_query: Transformed main query
+            
+        Returns:
+            Final converted SQL
+        """
         if not ctes:
             return main_query
         
-        # Sort CTEs by original appearance order
-        original_order = {name: idx for idx, name in enumerate(self.temp_table_order)}
-        
-        # Create a mapping from CTE name to original temp table name
-        cte_to_temp = {}
-        for temp_name, info in self.temp_tables.items():
-            cte_to_temp[info['cte_name']] = temp_name
-        
-        # Sort the CTEs by the original order of their corresponding temp tables
-        sorted_ctes = sorted(ctes, key=lambda x: original_order.get(cte_to_temp.get(x[0], ''), float('inf')))
-        
-        # Format each CTE with proper indentation
-        cte_clauses = []
-        for name, definition in sorted_ctes:
-            # Clean and indent the definition
-            clean_def = definition.rstrip(';')
-            indented_def = self._indent(clean_def)
-            cte_clauses.append(f"{name} AS (\n{indented_def}\n)")
-        
         # Check if the original query had semicolons BEFORE stripping them
         had_semicolon = main_query.rstrip().endswith(';')
         
-        # Now strip the semicolon for formatting
-        main_query = main_query.rstrip(';')
-        
-        # Use the saved flag to determine whether to add a semicolon
+        # Build the whole query in one list and join once at the end
+        parts: List[str] = ['WITH ']
+        for i, (name, definition) in enumerate(ctes):
+            if i:
+                parts.append(',\n')
+            # Definitions are already canonical, just indent them
+            parts.append(name)
+            parts.append(' AS (\n')
+            parts.append(self._indent(definition))
+            parts.append('\n)')
+        
+        # Strip the semicolon for formatting and use the saved flag to
+        # determine whether to add it back
+        parts.append('\n')
+        parts.append(main_query.rstrip(';'))
         if had_semicolon:
-            return f"WITH {',\n'.join(cte_clauses)}\n{main_query};"
-        else:
-            return f"WITH {',\n'.join(cte_clauses)}\n{main_query}"
+            parts.append(';')
+        
+        return ''.join(parts)
 
     def _indent(self, sql: str) -> str:
         """
@@ -524,5 +593,5 @@ class CTEConverter(BaseConverter):
         Returns:
             Indented SQL
         """
-        indent = ' ' * self.indent_spaces
-        return '\n'.join(f"{indent}{line}" for line in sql.split('\n'))
\ No newline at end of file
+        indent = self._indent_str
+        return indent + sql.replace('\n', '\n' + indent)
\ No newline at end of file
@@ -4,62 +4,212 @@ Custom exception classes for SQL Converter.
 This module contains all exception types used throughout the SQL Converter application,
 providing a consistent error handling approach and meaningful error messages.
 """
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Type
+
+
+def truncate_source(sql: str, limit: int = 100) -> str:
+    """
+    Shorten SQL for use as an exception source snippet.
+    
+    Args:
+        sql: SQL text the error refers to
+        limit: Maximum number of characters to keep
+        
+    Returns:
+        The SQL, cut to ``limit`` characters plus '...' when longer
+    """
+    return sql[:limit] + '...' if len(sql) > limit else sql
+
+
+def _format_location(line: Optional[int], position: Optional[int]) -> str:
+    """
+    Format the location suffix shared by errors that point into SQL text.
+    
+    Args:
+        line: 1-based line number, if known
+        position: Character position, if known
+        
+    Returns:
+        Text such as " at line 3 at position 12", or "" when both are None
+    """
+    if line is None:
+        if position is None:
+            return ""
+        return f" at position {position}"
+    if position is None:
+        return f" at line {line}"
+    return f" at line {line} at position {position}"
 
 
 class SQLConverterError(Exception):
-    """Base exception for all SQL Converter errors."""
+    """
+    Base exception for all SQL Converter errors.
+
+    The source snippet can be given either directly via ``source`` or lazily via
+    ``source_provider``, a callable that is only invoked when the snippet is
+    actually needed (e.g. when the exception is logged or stringified).
+
+    Only the raw fields are stored at construction time; the full message is
+    built on the first ``str()`` and cached, so exceptions that are caught and
+    handled without being displayed never pay for formatting.
+    """
     
-    def __init__(self, message: str, source: Optional[str] = None):
-        self.source = source
+    code = 1  # Stable numeric id, see EXCEPTION_BY_CODE
+    __slots__ = ('message', '_source', 'source_provider', '_cached_str')
+    
+    # Slots that are not shipped by __reduce__: the message travels as the
+    # constructor argument, the source is resolved up front and the cached
+    # text is rebuilt on demand
+    _UNPICKLED_SLOTS = frozenset(__slots__)
+    
+    def __init__(self, message: str, source: Optional[str] = None,
+                 source_provider: Optional[Callable[[], str]] = None):
+        super().__init__(message)
         self.message = message
-        super().__init__(f"{message} {f'[Source: {source}]' if source else ''}")
+        self._source = source
+        self.source_provider = source_provider
+        self._cached_str: Optional[str] = None
+
+    @property
+    def source(self) -> Optional[str]:
+        """Source snippet, resolved from ``source_provider`` on first access."""
+        if self._source is None and self.source_provider is not None:
+            # Drop the provider so it stops keeping the full SQL alive
+            provider, self.source_provider = self.source_provider, None
+            try:
+                self._source = provider()
+            except Exception:
+                # A failing provider must not hide the error being reported;
+                # the message is shown without a source instead
+                self._source = None
+        return self._source
+
+    @source.setter
+    def source(self, value: Optional[str]) -> None:
+        # An explicit value replaces any pending provider
+        self._source = value
+        self.source_provider = None
+        self._cached_str = None
+
+    def _format_message(self) -> str:
+        """
+        Render the message body, without the source suffix.
+        
+        Returns:
+            Formatted message; subclasses add their own context
+        """
+        return self.message
+
+    def __reduce__(self):
+        # Ship raw fields only; a source_provider (often a lambda) is resolved
+        # here rather than pickled
+        state = dict(self.__dict__)
+        state['_source'] = self.source
+        for klass in type(self).__mro__:
+            for name in klass.__dict__.get('__slots__', ()):
+                if name not in self._UNPICKLED_SLOTS:
+                    state[name] = getattr(self, name, None)
+        return (type(self), (self.message,), state)
+
+    def __setstate__(self, state: Optional[Dict[str, Any]]) -> None:
+        if state:
+            for name, value in state.items():
+                setattr(self, name, value)
+
+    def __str__(self) -> str:
+        if self._cached_str is None:
+            text = self._format_message()
+            source = self.source
+            self._cached_str = f"{text} [Source: {source}]" if source else text
+        return self._cached_str
 
 
 class ConfigError(SQLConverterError):
     """Raised when there's an issue with configuration."""
-    pass
+    
+    code = 2
+    __slots__ = ()
 
 
 class ValidationError(SQLConverterError):
     """Raised when validation of inputs fails."""
-    pass
+    
+    code = 3
+    __slots__ = ()
 
 
 class SQLSyntaxError(ValidationError):
     """Raised when SQL syntax is invalid."""
     
+    code = 4
+    __slots__ = ('position', 'line')
+    
+    _TEMPLATE = "SQL syntax error{loc}: {msg}"
+    
     def __init__(self, message: str, source: Optional[str] = None, 
                  position: Optional[int] = None, line: Optional[int] = None):
+        super().__init__(message, source)
         self.position = position
         self.line = line
-        location_info = ""
-        if line is not None:
-            location_info += f" at line {line}"
-        if position is not None:
-            location_info += f" at position {position}"
-        
-        super().__init__(f"SQL syntax error{location_info}: {message}", source)
+
+    def _format_message(self) -> str:
+        return self._TEMPLATE.format_map({
+            'loc': _format_location(self.line, self.position),
+            'msg': self.message,
+        })
 
 
 class ParserError(SQLConverterError):
     """Raised when there's an error during SQL parsing."""
-    pass
+    
+    code = 5
+    __slots__ = ()
 
 
 class ConverterError(SQLConverterError):
     """Raised when there's an error during SQL conversion."""
-    pass
+    
+    code = 6
+    __slots__ = ()
 
 
 class FileError(SQLConverterError):
     """Raised when there's an issue with file operations."""
     
+    code = 7
+    __slots__ = ('filepath',)
+    
+    _TEMPLATE = "{msg} [File: {filepath}]"
+    
     def __init__(self, message: str, filepath: Optional[str] = None):
+        super().__init__(message)
         self.filepath = filepath
-        super().__init__(f"{message} {f'[File: {filepath}]' if filepath else ''}")
+
+    def _format_message(self) -> str:
+        if self.filepath:
+            return self._TEMPLATE.format_map({'msg': self.message, 'filepath': self.filepath})
+        return self.message
 
 
 class PluginError(SQLConverterError):
     """Raised when there's an issue with a plugin or extension."""
-    pass
\ No newline at end of file
+    
+    code = 8
+    __slots__ = ()
+
+
+# Lookup tables for dispatching on error kind without isinstance ladders
+EXCEPTION_TYPES: Dict[str, Type[SQLConverterError]] = {
+    'error': SQLConverterError,
+    'config': ConfigError,
+    'validation': ValidationError,
+    'syntax': SQLSyntaxError,
+    'parser': ParserError,
+    'converter': ConverterError,
+    'file': FileError,
+    'plugin': PluginError,
+}
+
+EXCEPTION_BY_CODE: Dict[int, Type[SQLConverterError]] = {
+    exc_type.code: exc_type for exc_type in EXCEPTION_TYPES.values()
+}
@@ -1,22 +1,189 @@
 import re
+import sys
 import logging
+import functools
 from pathlib import Path
-from typing import List, Dict, Optional, Generator, Tuple, Union, Match
+from typing import List, Dict, Final, FrozenSet, Optional, Generator, Iterator, Pattern, Tuple, Union, Match
 
-from sql_converter.exceptions import SQLSyntaxError, ParserError
+from sql_converter.exceptions import SQLSyntaxError, ParserError, truncate_source
+
+
+# Token kind ids used by SQLParser.tokenize_bulk; TOKEN_KIND_NAMES maps an
+# id back to the name tokenize() reports
+(TOK_STRING, TOK_NUMBER, TOK_KEYWORD, TOK_IDENTIFIER,
+ TOK_OPERATOR, TOK_PAREN, TOK_BRACKET, TOK_SEMICOLON) = range(1, 9)
+TOKEN_KIND_NAMES: Final[Tuple[str, ...]] = (
+    '', 'STRING', 'NUMBER', 'KEYWORD', 'IDENTIFIER',
+    'OPERATOR', 'PAREN', 'BRACKET', 'SEMICOLON',
+)
+_TOKEN_KIND_IDS: Final[Dict[str, int]] = {
+    name: kind_id for kind_id, name in enumerate(TOKEN_KIND_NAMES) if name
+}
+
+
+def _compile_token_pattern(spec: Tuple[Tuple[str, str], ...]) -> Pattern[str]:
+    """
+    Compile a tokenizer spec into one pattern with a named group per kind.
+    
+    Args:
+        spec: (kind, regex) pairs, tried in order
+        
+    Returns:
+        Compiled tokenizer pattern
+    """
+    return re.compile(
+        '|'.join(f'(?P<{name}>{pattern})' for name, pattern in spec),
+        re.DOTALL | re.IGNORECASE
+    )
+
+
+def _compile_identifier_pattern(spec: Tuple[Tuple[str, str], ...],
+                                line_comment: str) -> Pattern[str]:
+    """
+    Compile the identifier scanner matching a tokenizer spec.
+    
+    Comments, strings, numbers and GROUP/ORDER BY are matched uncaptured so
+    only the identifiers tokenize() would yield land in the group.
+    
+    Args:
+        spec: Tokenizer spec the scanner must agree with
+        line_comment: Alternation of line comment starters in that spec
+        
+    Returns:
+        Compiled identifier pattern
+    """
+    return re.compile(
+        r'(?:{COMMENT}|{STRING}|{NUMBER}'
+        # Comments between the two words are spelled so they cannot backtrack
+        # into a shorter or longer match than tokenize() would see
+        r'|(?:GROUP|ORDER)(?![a-zA-Z0-9_#@$])(?:\s|(?:{line})[^\n]*\n|/\*(?:[^*]|\*(?!/))*\*/)+'
+        r'BY(?![a-zA-Z0-9_#@$]))'
+        r'|({IDENTIFIER})'.format_map({**dict(spec), 'line': line_comment}),
+        re.DOTALL | re.IGNORECASE
+    )
 
 
 class SQLParser:
     """Parser for SQL statements with comprehensive error handling."""
     
-    def __init__(self, dialect: str = 'ansi'):
-        self.dialect = dialect.lower()
-        self.logger = logging.getLogger(__name__)
-        self.comment_handlers = {
-            'ansi': self._handle_ansi_comments,
-            'tsql': self._handle_tsql_comments,
-            'mysql': self._handle_mysql_comments,
-        }
+    # Tokens that matter when splitting statements: a whole string literal
+    # (backslash escapes; an unterminated one runs to the end of the input),
+    # or a single paren or semicolon
+    _SPLIT_PATTERN: Final[Pattern[str]] = re.compile(
+        r"'(?:[^'\\]|\\.)*(?:'|\\?\Z)"
+        r'|"(?:[^"\\]|\\.)*(?:"|\\?\Z)'
+        r'|[();]',
+        re.DOTALL
+    )
+    
+    # T-SQL additionally nests [bracketed] names and ends a batch with GO on
+    # a line of its own
+    _TSQL_SPLIT_PATTERN: Final[Pattern[str]] = re.compile(
+        r"'(?:[^'\\]|\\.)*(?:'|\\?\Z)"
+        r'|"(?:[^"\\]|\\.)*(?:"|\\?\Z)'
+        r'|[()\[\];]'
+        r'|^[ \t]*(?P<go>GO)[ \t\r]*$',
+        re.DOTALL | re.MULTILINE | re.IGNORECASE
+    )
+    
+    # Token kinds produced by tokenize, tried in order
+    _TOKEN_SPEC: Final[Tuple[Tuple[str, str], ...]] = (
+        ('COMMENT',     r'--[^\n]*|/\*.*?\*/'),  # Line and block comments
+        ('STRING',      r"'(?:''|[^'])*'|\"(?:[^\"]|\"\")*\""),  # Quoted strings
+        ('NUMBER',      r'\d+(?:\.\d+)?(?:[eE][+-]?\d+)?'),     # Numbers
+        ('IDENTIFIER',  r'[a-zA-Z_][a-zA-Z0-9_#@$]*'),  # Identifiers
+        ('OPERATOR',    r'[+\-*/%=<>!~&|^]'),  # Operators
+        ('PAREN',       r'[()]'),              # Parentheses
+        ('BRACKET',     r'[\[\]]'),            # Brackets
+        ('SEMICOLON',   r';'),                 # Statement terminator
+        ('WHITESPACE',  r'\s+'),               # Whitespace
+    )
+    # MySQL also starts a line comment with '#'; in other dialects '#' begins
+    # temp table names and must stay part of the identifier
+    _MYSQL_TOKEN_SPEC: Final[Tuple[Tuple[str, str], ...]] = tuple(
+        (name, pattern + r'|#[^\n]*' if name == 'COMMENT' else pattern)
+        for name, pattern in _TOKEN_SPEC
+    )
+    _TOKEN_PATTERN: Final[Pattern[str]] = _compile_token_pattern(_TOKEN_SPEC)
+    _MYSQL_TOKEN_PATTERN: Final[Pattern[str]] = _compile_token_pattern(_MYSQL_TOKEN_SPEC)
+    
+    # Keywords are recognised after lexing by looking identifiers up here;
+    # two-word keywords are fused from a prefix identifier followed by BY
+    _KEYWORDS: Final[FrozenSet[str]] = frozenset({
+        'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'FROM', 'WHERE', 'JOIN',
+        'INTO', 'CREATE', 'TEMP', 'TABLE', 'AS', 'AND', 'OR',
+        'GROUP BY', 'ORDER BY', 'HAVING', 'LIMIT',
+    })
+    _KEYWORD_PREFIXES: Final[FrozenSet[str]] = frozenset(
+        keyword.split()[0] for keyword in _KEYWORDS if ' ' in keyword
+    )
+    
+    # Identifier extraction without going through tokenize()
+    _IDENTIFIER_PATTERN: Final[Pattern[str]] = _compile_identifier_pattern(_TOKEN_SPEC, '--')
+    _MYSQL_IDENTIFIER_PATTERN: Final[Pattern[str]] = _compile_identifier_pattern(
+        _MYSQL_TOKEN_SPEC, '--|#'
+    )
+    
+    # Single-pass statement validation scanner. Complete string literals are
+    # consumed whole so their contents never count as parentheses or clause
+    # keywords; a lone quote is one that is never closed.
+    _VALIDATION_PATTERN: Final[Pattern[str]] = re.compile(
+        r"""(?P<STRING>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")"""
+        r"""|(?P<QUOTE>['"])"""
+        r"""|(?P<ESCAPE>\\[\\'"])"""
+        r'|(?P<OPEN>\()|(?P<CLOSE>\))'
+        r'|\b(?:(?P<FROM>FROM)|(?P<WHERE>WHERE)|(?P<CROSS_JOIN>CROSS\s+JOIN)'
+        r'|(?P<JOIN>JOIN)|(?P<ON>ON)|(?P<USING>USING)'
+        r'|(?P<GROUP_BY>GROUP\s+BY)|(?P<ORDER_BY>ORDER\s+BY))\b',
+        re.IGNORECASE | re.DOTALL
+    )
+    
+    __slots__ = ('_dialect', '_split_pattern', '_token_pattern', '_identifier_pattern')
+    
+    # Shared by all instances; the logger name does not depend on the dialect
+    logger = logging.getLogger(__name__)
+    
+    def __init__(self, dialect: str = 'ansi') -> None:
+        self._dialect = dialect.lower()
+        # Resolve dialect-specific splitting once instead of per token
+        self._split_pattern = (
+            self._TSQL_SPLIT_PATTERN if self.dialect == 'tsql' else self._SPLIT_PATTERN
+        )
+        if self.dialect == 'mysql':
+            self._token_pattern = self._MYSQL_TOKEN_PATTERN
+            self._identifier_pattern = self._MYSQL_IDENTIFIER_PATTERN
+        else:
+            self._token_pattern = self._TOKEN_PATTERN
+            self._identifier_pattern = self._IDENTIFIER_PATTERN
+
+    @property
+    def dialect(self) -> str:
+        """Lower-cased dialect name, read-only since for_dialect() shares instances."""
+        return self._dialect
+
+    @classmethod
+    def for_dialect(cls, dialect: str = 'ansi') -> 'SQLParser':
+        """
+        Return a shared parser instance for a dialect.
+        
+        Parsers keep no per-call state and their dialect is read-only, so
+        one instance per dialect can be reused by any number of callers.
+        Constructing SQLParser directly still works and returns a private
+        instance.
+        
+        Args:
+            dialect: SQL dialect name, case-insensitive
+            
+        Returns:
+            Cached SQLParser for the dialect
+        """
+        return cls._shared_instance(dialect.lower())
+
+    @classmethod
+    @functools.lru_cache(maxsize=16)
+    def _shared_instance(cls, dialect: str) -> 'SQLParser':
+        """Build the cached instance behind for_dialect()."""
+        return cls(dialect)
 
     def validate_sql(self, sql: str) -> None:
         """
@@ -28,17 +195,30 @@ class SQLParser:
         Raises:
             SQLSyntaxError: When SQL contains syntax errors
         """
-        # Check for empty SQL
-        if not sql or not sql.strip():
-            raise SQLSyntaxError("Empty SQL statement", position=0, line=1)
-        
         # Split into statements for statement-level validation
         try:
-            statements = self.split_statements(sql, skip_validation=True)
+            statements = self._split_sql(sql)
         except Exception:
             # Fall back to whole script validation if splitting fails
             statements = [sql]
         
+        self._validate_statements(sql, statements)
+    
+    def _validate_statements(self, sql: str, statements: List[str]) -> None:
+        """
+        Validate a script that has already been split into statements.
+        
+        Args:
+            sql: The full SQL script the statements came from
+            statements: Statements of the script
+            
+        Raises:
+            SQLSyntaxError: When SQL contains syntax errors
+        """
+        # Check for empty SQL
+        if not sql or sql.isspace():
+            raise SQLSyntaxError("Empty SQL statement", position=0, line=1)
+        
         # Validate each statement separately
         for stmt in statements:
             self._validate_statement(stmt)
@@ -56,129 +236,116 @@ class SQLParser:
         # Find line number for error messages
         def get_line_number(position: int) -> int:
             """Get line number for a position in the SQL string."""
-            return stmt[:position].count('\n') + 1
+            return stmt.count('\n', 0, position) + 1
+        
+        # Scan once, recording what each rule needs, then apply the rules
+        # in their usual order so the first error reported is unchanged
+        from_where = None       # Position of a FROM directly followed by WHERE
+        from_pos = from_end = None
+        balance = 0
+        unexpected_close = None # First ')' without a matching '('
+        open_quote = None       # First quote character that is never closed
+        pending_join = None     # Earliest JOIN not yet followed by ON
+        pending_using = False
+        join_error = None       # (position, has USING) of the first JOIN missing ON
+        cross_join = False
+        first_group_by = None
+        last_where = None
+        
+        for match in self._VALIDATION_PATTERN.finditer(stmt):
+            kind = match.lastgroup
+            start = match.start()
+            if kind == 'OPEN':
+                balance += 1
+            elif kind == 'CLOSE':
+                balance -= 1
+                if balance < 0 and unexpected_close is None:
+                    unexpected_close = start
+            elif kind == 'QUOTE':
+                if open_quote is None:
+                    open_quote = match.group()
+            elif kind == 'JOIN':
+                if pending_join is None:
+                    pending_join = start
+                    pending_using = False
+            elif kind == 'ON':
+                pending_join = None
+            elif kind == 'USING':
+                pending_using = True
+            elif kind == 'CROSS_JOIN':
+                cross_join = True
+            elif kind in ('WHERE', 'GROUP_BY', 'ORDER_BY'):
+                if kind == 'WHERE':
+                    last_where = start
+                    if (from_where is None and from_end is not None
+                            and stmt[from_end:start].isspace()):
+                        from_where = from_pos
+                elif kind == 'GROUP_BY' and first_group_by is None:
+                    first_group_by = start
+                # These clauses end a JOIN; one still waiting for ON lacks it
+                if pending_join is not None and join_error is None:
+                    join_error = (pending_join, pending_using)
+                pending_join = None
+            
+            if kind == 'FROM':
+                from_pos, from_end = start, match.end()
+            else:
+                from_end = None
+        
+        if pending_join is not None and join_error is None:
+            join_error = (pending_join, pending_using)
         
         # Check for basic syntax errors with more precise error messages
-        if "FROM WHERE" in stmt.upper():
-            match = re.search(r'FROM\s+WHERE', stmt, re.IGNORECASE)
-            if match:
-                position = match.start()
-                raise SQLSyntaxError(
-                    "Missing table name between FROM and WHERE clauses",
-                    position=position,
-                    line=get_line_number(position)
-                )
+        if from_where is not None:
+            raise SQLSyntaxError(
+                "Missing table name between FROM and WHERE clauses",
+                position=from_where,
+                line=get_line_number(from_where)
+            )
         
         # Check for unbalanced parentheses with position tracking
-        if stmt.count('(') != stmt.count(')'):
-            # Find the position where parentheses become unbalanced
-            balance = 0
-            for i, char in enumerate(stmt):
-                if char == '(':
-                    balance += 1
-                elif char == ')':
-                    balance -= 1
-                    if balance < 0:
-                        # Too many closing parentheses
-                        raise SQLSyntaxError(
-                            "Unbalanced parentheses: unexpected ')'",
-                            position=i,
-                            line=get_line_number(i)
-                        )
-            # If we get here with positive balance, there are too many opening parentheses
-            if balance > 0:
+        if balance != 0:
+            if unexpected_close is not None:
+                # Too many closing parentheses
                 raise SQLSyntaxError(
-                    f"Unbalanced parentheses: missing {balance} closing parentheses",
-                    position=len(stmt),
-                    line=get_line_number(len(stmt))
+                    "Unbalanced parentheses: unexpected ')'",
+                    position=unexpected_close,
+                    line=get_line_number(unexpected_close)
                 )
+            # Too many opening parentheses
+            raise SQLSyntaxError(
+                f"Unbalanced parentheses: missing {balance} closing parentheses",
+                position=len(stmt),
+                line=get_line_number(len(stmt))
+            )
         
-        # Check for unbalanced quotes with detailed error messages
-        try:
-            self._check_balanced_quotes(stmt)
-        except SQLSyntaxError as e:
-            # Re-raise with line number information
-            position = getattr(e, 'position', None)
-            if position is not None:
-                line = get_line_number(position)
-                raise SQLSyntaxError(
-                    e.message,
-                    position=position,
-                    line=line
-                ) from None
-            raise
-        
-        # Check for JOIN without ON clause
-        join_without_on = re.search(r'\bJOIN\b(?:(?!\bON\b).)*?(?:\bWHERE\b|\bGROUP\s+BY\b|\bORDER\s+BY\b|$)', 
-                                   stmt, re.IGNORECASE | re.DOTALL)
-        if join_without_on and not re.search(r'\bCROSS\s+JOIN\b', stmt, re.IGNORECASE):
-            # Exclude CROSS JOIN which doesn't need ON
-            match_text = join_without_on.group(0)
-            if not re.search(r'\bUSING\b', match_text, re.IGNORECASE):  # Also exclude JOIN USING
-                position = join_without_on.start()
-                raise SQLSyntaxError(
-                    "JOIN clause missing ON condition",
-                    position=position,
-                    line=get_line_number(position)
-                )
+        # Check for unbalanced quotes
+        if open_quote is not None:
+            position = len(stmt) - 1
+            kind_name = 'single' if open_quote == "'" else 'double'
+            raise SQLSyntaxError(
+                f"Unbalanced {kind_name} quotes",
+                position=position,
+                line=get_line_number(position)
+            )
         
-        # Check for invalid GROUP BY syntax - within a single statement
-        group_where = re.search(r'\bGROUP\s+BY\b.*?\bWHERE\b', stmt, re.IGNORECASE | re.DOTALL)
-        if group_where:
-            position = group_where.start()
+        # Check for JOIN without ON clause; CROSS JOIN and JOIN ... USING
+        # don't need one
+        if join_error is not None and not cross_join and not join_error[1]:
+            position = join_error[0]
             raise SQLSyntaxError(
-                "WHERE clause must come before GROUP BY",
+                "JOIN clause missing ON condition",
                 position=position,
                 line=get_line_number(position)
             )
-
-    def _check_balanced_quotes(self, sql: str) -> None:
-        """
-        Check for balanced single and double quotes in SQL.
         
-        Args:
-            sql: The SQL statement to check
-            
-        Raises:
-            SQLSyntaxError: When quotes are unbalanced
-        """
-        # Track quotation state
-        in_single_quote = False
-        in_double_quote = False
-        escaped = False
-        
-        for i, char in enumerate(sql):
-            # Handle escape sequences
-            if escaped:
-                escaped = False
-                continue
-                
-            if char == '\\':
-                escaped = True
-                continue
-                
-            # Toggle quote state
-            if char == "'":
-                # Handle escaped single quotes ('') in SQL
-                if in_single_quote and i + 1 < len(sql) and sql[i + 1] == "'":
-                    # This is an escaped quote, skip the next one
-                    escaped = True
-                    continue
-                in_single_quote = not in_single_quote
-                    
-            elif char == '"':
-                # Handle escaped double quotes ("") in SQL
-                if in_double_quote and i + 1 < len(sql) and sql[i + 1] == '"':
-                    # This is an escaped quote, skip the next one
-                    escaped = True
-                    continue
-                in_double_quote = not in_double_quote
-                
-        # Check final state
-        if in_single_quote:
-            raise SQLSyntaxError("Unbalanced single quotes", position=len(sql) - 1)
-        if in_double_quote:
-            raise SQLSyntaxError("Unbalanced double quotes", position=len(sql) - 1)
+        # Check for invalid GROUP BY syntax - within a single statement
+        if first_group_by is not None and last_where is not None and last_where > first_group_by:
+            raise SQLSyntaxError(
+                "WHERE clause must come before GROUP BY",
+                position=first_group_by,
+                line=get_line_number(first_group_by)
+            )
 
     def split_statements(self, sql: str, skip_validation: bool = False) -> List[str]:
         """
@@ -186,7 +353,7 @@ class SQLParser:
         
         Args:
             sql: SQL code potentially containing multiple statements
-            skip_validation: If True, skip initial SQL validation
+            skip_validation: If True, skip validating the statements
             
         Returns:
             List of individual SQL statements
@@ -195,99 +362,135 @@ class SQLParser:
             ParserError: When the parser encounters an unrecoverable error
             SQLSyntaxError: When SQL contains syntax errors
         """
-        # Validate the overall SQL first (unless skipped)
+        statements = self._split_sql(sql)
+        
+        # Validate the statements just produced rather than re-splitting
+        # the script inside validate_sql
         if not skip_validation:
             try:
-                self.validate_sql(sql)
+                self._validate_statements(sql, statements)
             except SQLSyntaxError as e:
                 self.logger.error(f"SQL validation error: {e}")
                 raise
+        
+        return statements
+
+    @staticmethod
+    def _strip_comments(sql: str) -> str:
+        """
+        Replace comments ahead of statement splitting.
+        
+        Block comments become a space, then line comments are cut up to and
+        including their newline, which is kept. Each pass jumps between
+        markers with str.find and joins the kept slices once; input without
+        comment markers is returned unchanged.
+        
+        Args:
+            sql: SQL code to strip
             
-        statements = []
-        current = []
-        state = {
-            'in_string': False,
-            'string_char': None,
-            'in_comment': False,
-            'comment_type': None,
-            'paren_depth': 0,
-            'bracket_depth': 0,
-            'escape_next': False,
-        }
+        Returns:
+            SQL code without comments
+        """
+        find = sql.find
+        if '/*' in sql:
+            parts: List[str] = []
+            pos = 0
+            while True:
+                begin = find('/*', pos)
+                if begin < 0:
+                    break
+                end = find('*/', begin + 2)
+                if end < 0:
+                    # Unterminated block comments are left in place
+                    break
+                parts.append(sql[pos:begin])
+                parts.append(' ')
+                pos = end + 2
+            if parts:
+                parts.append(sql[pos:])
+                sql = ''.join(parts)
+                find = sql.find
+        
+        if '--' in sql:
+            parts = []
+            pos = 0
+            while pos < len(sql):
+                begin = find('--', pos)
+                if begin < 0:
+                    break
+                parts.append(sql[pos:begin])
+                parts.append('\n')
+                end = find('\n', begin + 2)
+                pos = len(sql) if end < 0 else end + 1
+            parts.append(sql[pos:])
+            sql = ''.join(parts)
+        
+        return sql
 
-        # Use regex to replace comments with spaces
-        # First, remove block comments (/* ... */)
-        sql = re.sub(r'/\*.*?\*/', ' ', sql, flags=re.DOTALL)
+    def _split_sql(self, sql: str) -> List[str]:
+        """
+        Split SQL into statements without validating them.
         
-        # Then handle line comments (--) by replacing until end of line
-        # Make sure to preserve newlines
-        sql = re.sub(r'--.*?(\n|$)', '\n', sql, flags=re.DOTALL)
+        Args:
+            sql: SQL code potentially containing multiple statements
+            
+        Returns:
+            List of individual SQL statements
+            
+        Raises:
+            ParserError: When the parser encounters an unrecoverable error
+        """
+        statements: List[str] = []
+
+        sql = self._strip_comments(sql)
 
         try:
-            for i, char in enumerate(sql):
-                # Handle string literals
-                if state['in_string']:
-                    if state['escape_next']:
-                        state['escape_next'] = False
-                    elif char == '\\':
-                        state['escape_next'] = True
-                    elif char == state['string_char']:
-                        state['in_string'] = False
-                        state['string_char'] = None
-                elif char in ("'", '"'):
-                    state['in_string'] = True
-                    state['string_char'] = char
-                
-                # Handle parentheses and brackets (only when not in a string)
-                if not state['in_string']:
-                    if char == '(':
-                        state['paren_depth'] += 1
-                    elif char == ')':
-                        state['paren_depth'] = max(0, state['paren_depth'] - 1)
-                    
-                    # Handle brackets for TSQL
-                    if self.dialect == 'tsql':
-                        if char == '[':
-                            state['bracket_depth'] += 1
-                        elif char == ']':
-                            state['bracket_depth'] = max(0, state['bracket_depth'] - 1)
-                
-                # Add character to current statement
-                current.append(char)
-                
-                # Check for statement termination
-                if (char == ';' and 
-                    not state['in_string'] and 
-                    state['paren_depth'] == 0 and 
-                    state['bracket_depth'] == 0):
-                    
-                    statement = ''.join(current).strip()
+            # Only quotes, parens, brackets, semicolons and (T-SQL) GO affect
+            # statement boundaries; the regex engine skips everything else
+            # and consumes each string literal in one match. Brackets are
+            # only matched by the T-SQL pattern.
+            start = 0
+            paren_depth = 0
+            bracket_depth = 0
+            for match in self._split_pattern.finditer(sql):
+                char = sql[match.start()]
+                if char == '(':
+                    paren_depth += 1
+                elif char == ')':
+                    if paren_depth:
+                        paren_depth -= 1
+                elif char == '[':
+                    bracket_depth += 1
+                elif char == ']':
+                    if bracket_depth:
+                        bracket_depth -= 1
+                elif paren_depth or bracket_depth:
+                    continue
+                elif char == ';':
+                    statement = sql[start:match.end()].strip()
+                    if statement:
+                        statements.append(statement)
+                    start = match.end()
+                elif match.lastgroup == 'go':
+                    # The batch separator itself is not part of a statement
+                    statement = sql[start:match.start()].strip()
                     if statement:
                         statements.append(statement)
-                    current = []
-                    state.update({
-                        'in_string': False,
-                        'string_char': None,
-                        'paren_depth': 0,
-                        'bracket_depth': 0,
-                        'escape_next': False,
-                    })
+                    start = match.end()
                 
         except Exception as e:
             # Convert any unexpected errors to ParserError with context
-            position = i if 'i' in locals() else 0
             raise ParserError(
                 f"Error while parsing SQL: {str(e)}",
-                source=sql[:100] + '...' if len(sql) > 100 else sql
+                source_provider=lambda: truncate_source(sql)
             ) from e
 
         # Add remaining content if not empty
-        final_statement = ''.join(current).strip()
+        final_statement = sql[start:].strip()
         if final_statement:
             statements.append(final_statement)
 
-        # Filter out any empty statements
-        return [stmt for stmt in statements if stmt]
+        return statements
 
     def _handle_ansi_comments(self, char: str, state: Dict, position: int) -> None:
         """
@@ -338,71 +541,113 @@ class SQLParser:
         Raises:
             ParserError: When tokenization fails
         """
-        try:
-            # First, preprocess to remove comments
-            clean_sql = self._remove_comments(sql)
-            
-            token_spec = [
-                ('STRING',      r"'(''|[^'])*'"),     # Single-quoted strings
-                ('STRING',      r'"([^"]|"")*"'),     # Double-quoted strings
-                ('NUMBER',      r'\d+(\.\d+)?([eE][+-]?\d+)?'),  # Numbers
-                ('KEYWORD',     r'\b(SELECT|INSERT|UPDATE|DELETE|FROM|WHERE|'
-                                r'JOIN|INTO|CREATE|TEMP|TABLE|AS|AND|OR|'
-                                r'GROUP BY|ORDER BY|HAVING|LIMIT)\b', re.IGNORECASE),
-                ('IDENTIFIER',  r'[a-zA-Z_][a-zA-Z0-9_#@$]*'),  # Identifiers
-                ('OPERATOR',    r'[+\-*/%=<>!~&|^]'),  # Operators
-                ('PAREN',       r'[()]'),              # Parentheses
-                ('BRACKET',     r'[\[\]]'),            # Brackets
-                ('SEMICOLON',   r';'),                 # Statement terminator
-                ('WHITESPACE',  r'\s+'),               # Whitespace
-            ]
+        kinds, values = self.tokenize_bulk(sql)
+        names = TOKEN_KIND_NAMES
+        for kind, value in zip(kinds, values):
+            yield (names[kind], value)
 
-            tok_regex = '|'.join(
-                f'(?P<{name}>{pattern})' for name, pattern in token_spec
-            )
-            flags = re.DOTALL | re.IGNORECASE
+    def tokenize_bulk(self, sql: str) -> Tuple[bytes, List[str]]:
+        """
+        Tokenize SQL into parallel arrays of kinds and values.
+        
+        kinds holds one TOK_* id per token, so callers can filter or count
+        token kinds with bytes operations instead of unpacking tuples.
+        
+        Args:
+            sql: SQL statement to tokenize
             
-            for match in re.finditer(tok_regex, clean_sql, flags):
+        Returns:
+            Tuple of (kinds, values) with kinds[i] the TOK_* id of values[i]
+            
+        Raises:
+            ParserError: When tokenization fails
+        """
+        kinds = bytearray()
+        values: List[str] = []
+        kind_ids = _TOKEN_KIND_IDS
+        try:
+            # Comments are matched as tokens and dropped like whitespace, so
+            # comment markers inside string literals are left alone.
+            # GROUP/ORDER held back until we know whether BY follows.
+            pending = None
+            last_end = 0
+            for match in self._token_pattern.finditer(sql):
                 kind = match.lastgroup
-                value = match.group().strip()
-                if kind == 'WHITESPACE':
+                gap = match.start() != last_end
+                last_end = match.end()
+                if gap and pending is not None:
+                    # Only whitespace and comments may separate GROUP and BY
+                    kinds.append(TOK_IDENTIFIER)
+                    values.append(pending)
+                    pending = None
+                # Every alternative is a named group, so kind is never None
+                # here; the check only narrows its type
+                if kind is None or kind == 'WHITESPACE' or kind == 'COMMENT':
                     continue
-                yield (kind, value)
+                value = match.group().strip()
+                kind_id = kind_ids[kind]
+                if kind_id == TOK_IDENTIFIER:
+                    upper = value.upper()
+                    if pending is not None:
+                        if upper == 'BY':
+                            kinds.append(TOK_KEYWORD)
+                            values.append(f'{pending} {value}')
+                            pending = None
+                            continue
+                        kinds.append(TOK_IDENTIFIER)
+                        values.append(pending)
+                        pending = None
+                    if upper in self._KEYWORD_PREFIXES:
+                        pending = value
+                        continue
+                    if upper in self._KEYWORDS:
+                        kind_id = TOK_KEYWORD
+                elif pending is not None:
+                    kinds.append(TOK_IDENTIFIER)
+                    values.append(pending)
+                    pending = None
+                kinds.append(kind_id)
+                values.append(value)
+            if pending is not None:
+                kinds.append(TOK_IDENTIFIER)
+                values.append(pending)
                 
         except Exception as e:
             # Convert any unexpected errors to ParserError
             raise ParserError(
                 f"Error during SQL tokenization: {str(e)}",
-                source=sql[:100] + '...' if len(sql) > 100 else sql
+                source_provider=lambda: truncate_source(sql)
             ) from e
+        
+        return bytes(kinds), values
 
-    def _remove_comments(self, sql: str) -> str:
+    def iter_identifiers(self, sql: str) -> Iterator[str]:
         """
-        Remove SQL comments to simplify tokenization.
+        Lazily extract identifiers from SQL query.
+        
+        Scanning advances only as far as the caller consumes, so callers
+        that stop early skip the rest of the input.
         
         Args:
-            sql: SQL statement containing comments
+            sql: SQL statement to extract identifiers from
             
-        Returns:
-            SQL with comments removed
+        Yields:
+            SQL identifiers in order of appearance
+            
+        Raises:
+            ParserError: When identifier extraction fails
         """
         try:
-            # First, remove /* */ block comments
-            pattern = r'/\*[\s\S]*?\*/'
-            sql = re.sub(pattern, ' ', sql)
-            
-            # Then, remove -- line comments (up to end of line)
-            pattern = r'--.*?$'
-            sql = re.sub(pattern, ' ', sql, flags=re.MULTILINE)
-            
-            # Finally, remove # MySQL style comments
-            pattern = r'#.*?$'
-            sql = re.sub(pattern, ' ', sql, flags=re.MULTILINE)
-            
-            return sql
+            keywords = self._KEYWORDS
+            for match in self._identifier_pattern.finditer(sql):
+                value = match.group(1)
+                if value and value.upper() not in keywords:
+                    # Names repeat heavily, so intern them to share one
+                    # string object per name
+                    yield sys.intern(value)
         except Exception as e:
-            # Convert regex errors to ParserError
-            raise ParserError(f"Error removing comments: {str(e)}")
+            # Convert any unexpected errors to ParserError
+            raise ParserError(f"Error extracting identifiers: {str(e)}")
 
     def parse_identifiers(self, sql: str) -> List[str]:
         """
@@ -417,16 +662,4 @@ class SQLParser:
         Raises:
             ParserError: When identifier extraction fails
         """
-        try:
-            identifiers = []
-            for kind, value in self.tokenize(sql):
-                if kind == 'IDENTIFIER':
-                    # Handle quoted identifiers
-                    clean_value = value.strip('[]"\'`')
-                    identifiers.append(clean_value)
-            return identifiers
-        except Exception as e:
-            if isinstance(e, ParserError):
-                raise
-            # Convert other errors to ParserError
-            raise ParserError(f"Error extracting identifiers: {str(e)}")
\ No newline at end of file
+        return list(self.iter_identifiers(sql))
@@ -1,5 +1,6 @@
 import pytest
 from sql_converter.converters.cte import CTEConverter
+from sql_converter.exceptions import ValidationError
 
 def test_basic_cte_conversion():
     sql = "SELECT * INTO #temp FROM users; SELECT * FROM #temp;"
@@ -36,4 +37,61 @@ def test_nested_temp_tables():
     converter = CTEConverter()
     converted = converter.convert(sql)
     assert "WITH outer AS" in converted
-    assert "inner AS" in converted
\ No newline at end of file
+    assert "inner AS" in converted
+
+def test_custom_pattern_references():
+    sql = """
+    SELECT * INTO tmp_a FROM s;
+    SELECT b.* INTO tmp_b FROM tmp_a b;
+    SELECT * FROM TMP_A JOIN tmp_b ON tmp_a.id = tmp_b.id;
+    """
+    converter = CTEConverter(config={'temp_table_patterns': ['tmp_*']})
+    converted = converter.convert(sql)
+    assert "tmp_a AS" in converted
+    assert "tmp_b AS" in converted
+    assert "FROM tmp_a JOIN tmp_b" in converted
+
+def test_main_query_joining_dependent_temp_tables():
+    sql = (
+        "SELECT * INTO #a FROM s; SELECT * INTO #b FROM #a; "
+        "SELECT * FROM #a JOIN #b ON #a.id = #b.id;"
+    )
+    converter = CTEConverter()
+    converted = converter.convert(sql)
+    assert converted.index("a AS") < converted.index("b AS")
+    assert "FROM a JOIN b" in converted
+
+def test_circular_dependency_names_a_table_on_the_cycle():
+    sql = (
+        "SELECT * INTO #w FROM #x; SELECT * INTO #x FROM #y; "
+        "SELECT * INTO #y FROM #x; SELECT * FROM #w;"
+    )
+    with pytest.raises(ValidationError, match="involving #x"):
+        CTEConverter().convert(sql)
+
+def test_redefined_temp_table_drops_every_definition():
+    sql = (
+        "SELECT * INTO #a FROM s; SELECT * INTO #a FROM t; "
+        "SELECT * FROM #a;"
+    )
+    converted = CTEConverter().convert(sql)
+    assert "FROM t" in converted
+    assert "FROM s" not in converted
+    assert "INTO" not in converted
+
+def test_ctes_follow_dependency_order_over_appearance():
+    sql = (
+        "SELECT * INTO #a FROM s; SELECT * INTO #b FROM t; "
+        "SELECT * INTO #a FROM #b; SELECT * FROM #a;"
+    )
+    converted = CTEConverter().convert(sql)
+    assert converted.index("b AS") < converted.index("a AS")
+    assert "FROM b" in converted
+
+def test_ctes_keep_declaration_order_of_created_tables():
+    sql = (
+        "CREATE TEMP TABLE #a (id INT); SELECT * INTO #b FROM t; "
+        "INSERT INTO #a SELECT id FROM s; SELECT * FROM #a JOIN #b ON #a.id = #b.id;"
+    )
+    converted = CTEConverter().convert(sql)
+    assert converted.index("a AS") < converted.index("b AS")
@@ -1,5 +1,6 @@
 import pytest
-from sql_converter.parsers.sql_parser import SQLParser
+from sql_converter.parsers.sql_parser import SQLParser, TOK_IDENTIFIER, TOK_KEYWORD
+from sql_converter.exceptions import SQLSyntaxError
 
 def test_statement_splitting():
     sql = """
@@ -29,4 +30,60 @@ def test_comment_handling():
     parser = SQLParser()
     statements = parser.split_statements(sql)
     assert len(statements) == 1
-    assert "SELECT" in statements[0]
\ No newline at end of file
+    assert "SELECT" in statements[0]
+
+def test_for_dialect_reuses_instances():
+    parser = SQLParser.for_dialect('tsql')
+    assert parser is SQLParser.for_dialect('tsql')
+    assert parser.dialect == 'tsql'
+    assert parser is not SQLParser.for_dialect('ansi')
+    assert parser is SQLParser.for_dialect('TSQL')
+    with pytest.raises(AttributeError):
+        parser.dialect = 'ansi'
+
+def test_tsql_go_batch_separator():
+    sql = "SELECT 1\nGO\nSELECT 'GO'\n  go  \nSELECT ago FROM t"
+    statements = SQLParser(dialect='tsql').split_statements(sql)
+    assert statements == ["SELECT 1", "SELECT 'GO'", "SELECT ago FROM t"]
+    assert len(SQLParser().split_statements(sql)) == 1
+
+def test_tokenize():
+    sql = "SELECT a, 'x;y' FROM t -- note\nWHERE n >= 1.5;"
+    tokens = list(SQLParser().tokenize(sql))
+    assert tokens == [
+        ('KEYWORD', 'SELECT'), ('IDENTIFIER', 'a'), ('STRING', "'x;y'"),
+        ('KEYWORD', 'FROM'), ('IDENTIFIER', 't'), ('KEYWORD', 'WHERE'),
+        ('IDENTIFIER', 'n'), ('OPERATOR', '>'), ('OPERATOR', '='),
+        ('NUMBER', '1.5'), ('SEMICOLON', ';'),
+    ]
+
+def test_tokenize_compound_keywords():
+    tokens = list(SQLParser().tokenize("SELECT grp FROM t GROUP BY grp ORDER\n  by 1"))
+    assert ('KEYWORD', 'GROUP BY') in tokens
+    assert ('KEYWORD', 'ORDER by') in tokens
+    assert ('IDENTIFIER', 'grp') in tokens
+
+def test_validate_ignores_string_contents():
+    parser = SQLParser()
+    parser.validate_sql("SELECT ')', 'it''s JOIN' FROM t WHERE a = '('")
+    with pytest.raises(SQLSyntaxError, match="JOIN clause missing ON"):
+        parser.validate_sql("SELECT * FROM a JOIN b WHERE x = 'ON'")
+
+def test_validate_escaped_backslash_does_not_escape_quote():
+    parser = SQLParser()
+    parser.validate_sql(r"SELECT ]\\''] FROM t")
+    with pytest.raises(SQLSyntaxError, match="Unbalanced single quotes"):
+        parser.validate_sql(r"SELECT \\' FROM t")
+
+def test_tokenize_bulk_matches_tokenize():
+    parser = SQLParser()
+    sql = "SELECT a, 'b' FROM t ORDER BY a;"
+    kinds, values = parser.tokenize_bulk(sql)
+    assert kinds[0] == TOK_KEYWORD
+    assert kinds.count(TOK_IDENTIFIER) == 3
+    assert values == [value for _, value in parser.tokenize(sql)]
+
+def test_hash_comments_only_in_mysql():
+    sql = "SELECT * FROM #tmp WHERE x = 1 # note"
+    assert SQLParser('tsql').parse_identifiers(sql) == ['tmp', 'x', 'note']
+    assert SQLParser('mysql').parse_identifiers(sql) == []
@@ -0,0 +1,46 @@
+import pickle
+import pytest
+from sql_converter.exceptions import (
+    EXCEPTION_BY_CODE, EXCEPTION_TYPES, ConverterError, FileError, SQLSyntaxError
+)
+
+def test_source_provider_resolved_once():
+    sql = "SELECT * FROM t"
+    error = ConverterError("boom", source_provider=lambda: sql)
+    assert str(error) == "boom [Source: SELECT * FROM t]"
+    assert error.source_provider is None
+    error.source = "SELECT 1"
+    assert str(error) == "boom [Source: SELECT 1]"
+
+def test_failing_source_provider_falls_back_to_message():
+    def provider():
+        raise RuntimeError("source unavailable")
+    error = ConverterError("boom", source_provider=provider)
+    assert str(error) == "boom"
+    assert error.source is None
+
+def test_syntax_error_pickle_round_trip():
+    error = SQLSyntaxError("Unbalanced single quotes", source="SELECT 'x", position=8, line=2)
+    restored = pickle.loads(pickle.dumps(error))
+    assert type(restored) is SQLSyntaxError
+    assert (restored.position, restored.line) == (8, 2)
+    assert restored.message == "Unbalanced single quotes"
+    assert str(restored) == str(error)
+
+def test_file_error_pickle_round_trip():
+    error = FileError("Cannot read input", filepath="queries/a.sql")
+    restored = pickle.loads(pickle.dumps(error))
+    assert restored.filepath == "queries/a.sql"
+    assert str(restored) == "Cannot read input [File: queries/a.sql]"
+
+def test_source_provider_resolved_before_pickling():
+    error = ConverterError("Conversion failed", source_provider=lambda: "SELECT * FROM #t")
+    restored = pickle.loads(pickle.dumps(error))
+    assert restored.source_provider is None
+    assert str(restored) == "Conversion failed [Source: SELECT * FROM #t]"
+
+def test_exception_codes_are_unique_and_map_back():
+    codes = [exc_type.code for exc_type in EXCEPTION_TYPES.values()]
+    assert len(set(codes)) == len(codes)
+    for exc_type in EXCEPTION_TYPES.values():
+        assert EXCEPTION_BY_CODE[exc_type.code] is exc_type